@@ -8,6 +8,14 @@ class Settings(BaseSettings):
     # Database
     SQLALCHEMY_DATABASE_URI: str = "sqlite:///./hackathon.db"
     
+    # Dataset storage tiers
+    DATASET_DIR: str = "app/core"
+    ARCHIVE_DIR: str = "app/core/archive"
+    COLD_AFTER_SECONDS: int = 7 * 24 * 3600  # archive datasets idle this long
+    ARCHIVE_SWEEP_INTERVAL_SECONDS: int = 3600
+    ARCHIVE_COMPRESS_LEVEL: int = 1  # fast gzip level keeps restores quick
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # bytes memory-mapped per hot dataset
+    
     class Config:
         case_sensitive = True
 
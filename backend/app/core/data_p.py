@@ -1,6 +1,8 @@
 import pandas as pd
 import sqlite3
 import json
+from app.services.range_index import build_range_indexes
+from app.services.sampling import build_sample_table
 
 csv_path = 'Independent_Medical_Reviews.csv'  
 
@@ -28,12 +30,25 @@ def preprocess_data(df):
 
 
 
-# Detect schema: numeric, categorical, sensitive
+# True if every value of a text column is an ISO-like date (e.g. 2023-07-04)
+def is_date_column(series):
+    # Text loads as object on pandas 2 and as the str dtype on pandas 3
+    if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        return False
+    if not series.astype(str).str.contains(r"^\d{4}-\d{1,2}-\d{1,2}").all():
+        return False
+    parsed = pd.to_datetime(series, errors="coerce")
+    return bool(parsed.notna().all())
+
+
+# Detect schema: numeric, date, categorical, sensitive
 def detect_schema(df):
     schema = {}
     for col in df.columns:
         if pd.api.types.is_numeric_dtype(df[col]):
             schema[col] = "numeric"
+        elif is_date_column(df[col]):
+            schema[col] = "date"
         elif df[col].nunique() <= 50:
             schema[col] = "categorical"
         else:
@@ -47,7 +62,16 @@ def detect_schema(df):
 def filter_sensitive(df, schema):
     safe_cols = [col for col, col_type in schema.items() if col_type != "sensitive"]
     return df[safe_cols]
-  
+
+
+# Store dates as zero-padded ISO strings so text order is chronological
+def normalize_dates(df, schema):
+    df = df.copy()
+    for col, col_type in schema.items():
+        if col_type == "date" and col in df.columns:
+            df[col] = pd.to_datetime(df[col]).dt.strftime("%Y-%m-%d")
+    return df
+
 
 #Save to SQLite database
 def save_to_sqlite(df, db_path="guardian.db", table_name="patients"):
@@ -68,8 +92,16 @@ def run_pipeline(csv_path, db_path="../hackathon.db"):
 
     df = filter_sensitive(df, schema)
 
+    df = normalize_dates(df, schema)
+
     save_to_sqlite(df, db_path=db_path, table_name="patients")
 
+    # Prefix-sum indexes for fast range-filtered COUNT/SUM/AVERAGE
+    build_range_indexes(df, db_path, table_name="patients", schema=schema)
+
+    # Uniform sample for approximate queries
+    build_sample_table(df, db_path, table_name="patients")
+
     print(f"SQLite DB: {db_path}")
     print(f"Schema saved to: schema.json")
 
@@ -1,21 +1,18 @@
-import os
-import sqlite3
 from fastapi import APIRouter, HTTPException, Query
 from typing import List
+from app.services.range_index import INTERNAL_TABLE_PREFIX
+from app.services.storage import storage_manager
 
 router = APIRouter()
 
-DB_DIR = os.path.join("app", "core")
-
 @router.get("/databases")
 def list_databases():
-    """List all available databases with short IDs."""
+    """List all registered databases with short IDs and storage tier."""
     try:
-        dbs = [f for f in os.listdir(DB_DIR) if f.endswith('.db')]
         # Use the 8-char hash as ID (from filename)
         db_list = [
-            {"id": f.replace('db_', '').replace('.db', ''), "name": f}
-            for f in dbs
+            {"id": d["name"].replace('db_', '').replace('.db', ''), **d}
+            for d in storage_manager.list_datasets()
         ]
         return {"databases": db_list}
     except Exception as e:
@@ -24,29 +21,33 @@ def list_databases():
 @router.get("/tables")
 def list_tables(database: str = Query(...)):
     """List all tables in a database."""
-    db_path = os.path.join(DB_DIR, database)
-    if not os.path.exists(db_path):
+    if not storage_manager.exists(database):
         raise HTTPException(status_code=404, detail="Database not found")
+    conn = None
     try:
-        conn = sqlite3.connect(db_path)
+        conn = storage_manager.connect(database)
         cursor = conn.cursor()
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = [row[0] for row in cursor.fetchall()]
-        conn.close()
+        tables = [row[0] for row in cursor.fetchall() if not row[0].startswith(INTERNAL_TABLE_PREFIX)]
         return {"tables": tables}
+    except FileNotFoundError as fe:
+        raise HTTPException(status_code=404, detail=str(fe))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if conn is not None:
+            conn.close()
 
 import pandas as pd
 
 @router.get("/columns")
 def list_columns(database: str = Query(...), table: str = Query(...)):
     """List all columns in a table, with type info."""
-    db_path = os.path.join(DB_DIR, database)
-    if not os.path.exists(db_path):
+    if not storage_manager.exists(database):
         raise HTTPException(status_code=404, detail="Database not found")
+    conn = None
     try:
-        conn = sqlite3.connect(db_path)
+        conn = storage_manager.connect(database)
         # Use pandas to get dtypes
         df = pd.read_sql_query(f'SELECT * FROM {table} LIMIT 100', conn)
         columns = []
@@ -57,48 +58,55 @@ def list_columns(database: str = Query(...), table: str = Query(...)):
             else:
                 col_type = 'categorical'
             columns.append({"name": col, "type": col_type})
-        conn.close()
         return {"columns": columns}
+    except FileNotFoundError as fe:
+        raise HTTPException(status_code=404, detail=str(fe))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if conn is not None:
+            conn.close()
 
 
 @router.get("/column_values")
 def column_values(database: str = Query(...), table: str = Query(...), column: str = Query(...), limit: int = Query(50)):
     """Return distinct values for categorical columns or min/max for numeric columns."""
-    db_path = os.path.join(DB_DIR, database)
-    if not os.path.exists(db_path):
+    if not storage_manager.exists(database):
         raise HTTPException(status_code=404, detail="Database not found")
+    conn = None
     try:
-        conn = sqlite3.connect(db_path)
+        conn = storage_manager.connect(database)
         cur = conn.cursor()
         # Inspect dtype via sample
         df = pd.read_sql_query(f'SELECT {column} FROM {table} LIMIT 100', conn)
         if df.empty:
-            conn.close()
             return {"type": "unknown", "values": [], "min": None, "max": None}
         dtype = str(df[column].dtype)
         if dtype.startswith('int') or dtype.startswith('float'):
             row = cur.execute(f'SELECT MIN({column}), MAX({column}) FROM {table}').fetchone()
-            conn.close()
             return {"type": "numeric", "min": row[0], "max": row[1]}
         else:
             cur.execute(f'SELECT {column} FROM {table} GROUP BY {column} ORDER BY COUNT(*) DESC LIMIT ?', (limit,))
             values = [r[0] for r in cur.fetchall()]
-            conn.close()
             return {"type": "categorical", "values": values}
+    except FileNotFoundError as fe:
+        raise HTTPException(status_code=404, detail=str(fe))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if conn is not None:
+            conn.close()
 
 
 @router.delete("/database")
 def delete_database(database: str = Query(...)):
-    """Delete a database file by name."""
-    db_path = os.path.join(DB_DIR, database)
-    if not os.path.exists(db_path):
+    """Delete a database, hot or archived, by name."""
+    if not storage_manager.exists(database):
         raise HTTPException(status_code=404, detail="Database not found")
     try:
-        os.remove(db_path)
+        storage_manager.delete(database)
         return {"message": "Database deleted", "database": database}
+    except FileNotFoundError as fe:
+        raise HTTPException(status_code=404, detail=str(fe))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
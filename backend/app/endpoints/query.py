@@ -1,14 +1,22 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.schemas.query import DifferentialPrivacyQuery, QueryResponse
-from app.services.differential_privacy import DifferentialPrivacyService
+from sqlalchemy.orm import Session
+from app.schemas.query import (
+    DifferentialPrivacyQuery, QueryResponse,
+    BucketCountQuery, BucketCountResponse,
+    FederatedQuery, FederatedQueryResponse,
+)
+from app.services.differential_privacy import DifferentialPrivacyService, MIN_COHORT
+from app.services.storage import storage_manager
 
 router = APIRouter()
 dp_service = DifferentialPrivacyService()
 
+def open_database_session(database_name: str) -> Session:
+    """Open a new Session on an uploaded database, restoring it if archived"""
+    return storage_manager.open_session(database_name)
+
 @router.post("/query", response_model=QueryResponse)
-async def execute_differential_privacy_query(
+def execute_differential_privacy_query(
     query: DifferentialPrivacyQuery
 ):
     """
@@ -47,22 +55,37 @@ async def execute_differential_privacy_query(
         if not hasattr(query, 'database_name') and 'database_name' not in query.__dict__:
             raise HTTPException(status_code=400, detail="database_name must be provided in the request body")
         db_filename = query.__dict__.get('database_name') or getattr(query, 'database_name', None)
-        db_path = f"sqlite:///app/core/{db_filename}"
-        engine = create_engine(db_path, connect_args={"check_same_thread": False})
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        db = SessionLocal()
+        if not storage_manager.exists(db_filename):
+            raise HTTPException(status_code=404, detail="Database not found")
+        db = open_database_session(db_filename)
+        error_bound = None
+        sample_rate = None
         try:
-            private_result, noise_added = dp_service.execute_private_query(
-                operation=query.operation,
-                column=query.column,
-                table=query.table,
-                epsilon=query.epsilon,
-                db=db,
-                filters=query.filters
-            )
+            if query.approximate:
+                private_result, noise_added, error_bound, sample_rate = dp_service.execute_approximate_query(
+                    operation=query.operation,
+                    column=query.column,
+                    table=query.table,
+                    epsilon=query.epsilon,
+                    db=db,
+                    filters=query.filters
+                )
+            else:
+                private_result, noise_added = dp_service.execute_private_query(
+                    operation=query.operation,
+                    column=query.column,
+                    table=query.table,
+                    epsilon=query.epsilon,
+                    db=db,
+                    filters=query.filters
+                )
         finally:
             db.close()
-        
+
+        message = f"Differential privacy applied with ε={query.epsilon}. Noise added: {noise_added:.4f}"
+        if query.approximate:
+            message += f". Approximate from {sample_rate:.2%} sample, 95% error bound ±{error_bound:.4f}"
+
         # Prepare response
         response = QueryResponse(
             result=private_result,
@@ -71,13 +94,22 @@ async def execute_differential_privacy_query(
             table=query.table,
             epsilon=query.epsilon,
             noise_added=noise_added,
-            message=f"Differential privacy applied with ε={query.epsilon}. Noise added: {noise_added:.4f}"
+            message=message,
+            approximate=query.approximate,
+            error_bound=error_bound,
+            sample_rate=sample_rate
         )
         
         return response
     except HTTPException as he:
         # Re-raise to let FastAPI handle and include CORS headers
         raise he
+    except FileNotFoundError as fe:
+        # Dataset is unregistered or its files are gone
+        raise HTTPException(
+            status_code=404,
+            detail=str(fe)
+        )
     except ValueError as ve:
         # Validation/runtime errors (e.g., cohort too small)
         import traceback
@@ -97,3 +129,172 @@ async def execute_differential_privacy_query(
             status_code=500,
             detail=f"Error executing differential privacy query: {repr(e)}"
         )
+
+
+@router.post("/query/buckets", response_model=BucketCountResponse)
+def execute_differential_privacy_bucket_counts(
+    query: BucketCountQuery
+):
+    """
+    Execute a differentially private histogram over a numeric or date column
+
+    Counts are served from the prefix-sum range index built at upload time,
+    e.g. monthly admissions with boundaries ["2023-01-01", "2023-02-01", ...].
+
+    Args:
+        query: BucketCountQuery containing column, table, bucket boundaries and epsilon
+
+    Returns:
+        BucketCountResponse with one private count per bucket
+    """
+    try:
+        if not dp_service.validate_epsilon(query.epsilon):
+            raise HTTPException(
+                status_code=400,
+                detail="Epsilon must be between 0 and 10"
+            )
+
+        if not dp_service.validate_range(query.epsilon, query.epsilon_budget):
+            raise HTTPException(
+                status_code=400,
+                detail="Epsilon must be less than or equal to epsilon budget"
+            )
+
+        if not storage_manager.exists(query.database_name):
+            raise HTTPException(status_code=404, detail="Database not found")
+
+        db = open_database_session(query.database_name)
+        try:
+            counts, noise_added = dp_service.execute_private_bucket_counts(
+                column=query.column,
+                table=query.table,
+                boundaries=query.boundaries,
+                epsilon=query.epsilon,
+                db=db
+            )
+        finally:
+            db.close()
+
+        return BucketCountResponse(
+            counts=counts,
+            boundaries=query.boundaries,
+            column=query.column,
+            table=query.table,
+            epsilon=query.epsilon,
+            noise_added=noise_added,
+            message=(
+                f"Differential privacy applied with ε={query.epsilon} per bucket over {len(counts)} disjoint buckets. "
+                f"{counts.count(None)} buckets suppressed (fewer than {MIN_COHORT} rows)"
+            )
+        )
+    except HTTPException as he:
+        raise he
+    except FileNotFoundError as fe:
+        # Dataset is unregistered or its files are gone
+        raise HTTPException(
+            status_code=404,
+            detail=str(fe)
+        )
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=400,
+            detail=str(ve)
+        )
+    except Exception as e:
+        import traceback
+        print("\n--- BUCKET QUERY ERROR ---")
+        traceback.print_exc()
+        print("--- END BUCKET QUERY ERROR ---\n")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error executing differential privacy bucket query: {repr(e)}"
+        )
+
+
+@router.post("/query/federated", response_model=FederatedQueryResponse)
+def execute_differential_privacy_federated_query(
+    query: FederatedQuery
+):
+    """
+    Execute one differentially private query across several databases
+
+    Partial COUNT/SUM values are computed on every database in parallel and
+    combined exactly before noise is added once, so ε is spent a single time.
+
+    Declared sync so FastAPI runs it in its threadpool; the blocking fan-out
+    over databases must not stall the event loop.
+
+    Args:
+        query: FederatedQuery containing operation, column, table, epsilon, database_names and optional filters
+
+    Returns:
+        FederatedQueryResponse with the private result over all databases
+    """
+    try:
+        if not dp_service.validate_epsilon(query.epsilon):
+            raise HTTPException(
+                status_code=400,
+                detail="Epsilon must be between 0 and 10"
+            )
+
+        if not dp_service.validate_range(query.epsilon, query.epsilon_budget):
+            raise HTTPException(
+                status_code=400,
+                detail="Epsilon must be less than or equal to epsilon budget"
+            )
+
+        if len(set(query.database_names)) != len(query.database_names):
+            raise HTTPException(
+                status_code=400,
+                detail="database_names must not contain duplicates"
+            )
+
+        missing = [name for name in query.database_names if not storage_manager.exists(name)]
+        if missing:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Database not found: {', '.join(missing)}"
+            )
+
+        private_result, noise_added = dp_service.execute_federated_query(
+            operation=query.operation,
+            column=query.column,
+            table=query.table,
+            epsilon=query.epsilon,
+            database_names=query.database_names,
+            open_session=open_database_session,
+            filters=query.filters
+        )
+
+        return FederatedQueryResponse(
+            result=private_result,
+            operation=query.operation,
+            column=query.column,
+            table=query.table,
+            database_names=query.database_names,
+            epsilon=query.epsilon,
+            noise_added=noise_added,
+            message=f"Differential privacy applied once with ε={query.epsilon} over {len(query.database_names)} databases. Noise added: {noise_added:.4f}"
+        )
+    except HTTPException as he:
+        raise he
+    except FileNotFoundError as fe:
+        # Dataset is unregistered or its files are gone
+        raise HTTPException(
+            status_code=404,
+            detail=str(fe)
+        )
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=400,
+            detail=str(ve)
+        )
+    except Exception as e:
+        import traceback
+        print("\n--- FEDERATED QUERY ERROR ---")
+        traceback.print_exc()
+        print("--- END FEDERATED QUERY ERROR ---\n")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error executing differential privacy federated query: {repr(e)}"
+        )
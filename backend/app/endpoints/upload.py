@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from typing import Optional
 import uuid
 from app.core.data_p import run_pipeline
+from app.services.storage import storage_manager
 
 router = APIRouter()
 
@@ -67,10 +68,11 @@ async def upload_csv(
         
         # Generate unique database name in app/core/
         db_name = f"db_{uuid.uuid4().hex[:8]}.db"
-        db_path = os.path.join("app", "core", db_name)
+        db_path = storage_manager.hot_path(db_name)
 
         # Process the file
         df, schema = run_pipeline(file_location, db_path)
+        storage_manager.register(db_name)
         
         # Clean up the uploaded file
         os.remove(file_location)
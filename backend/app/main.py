@@ -1,8 +1,11 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.endpoints.query import router as query_router
 from app.endpoints.upload import router as upload_router
 from app.endpoints.meta import router as meta_router
+from app.core.config import settings
+from app.services.storage import storage_manager
 
 app = FastAPI(title="Differential Privacy API", version="0.1.0")
 
@@ -20,6 +23,22 @@ app.include_router(query_router, tags=["Differential Privacy"])
 app.include_router(upload_router, tags=["Data Upload"])
 app.include_router(meta_router, tags=["Meta Info"])
 
+async def archive_cold_datasets_periodically():
+    """Move idle datasets to the compressed archive tier in the background"""
+    while True:
+        await asyncio.sleep(settings.ARCHIVE_SWEEP_INTERVAL_SECONDS)
+        try:
+            archived = await asyncio.to_thread(storage_manager.archive_cold_datasets)
+            if archived:
+                print(f"Archived cold datasets: {', '.join(archived)}")
+        except Exception as e:
+            print(f"Archive sweep failed: {e!r}")
+
+@app.on_event("startup")
+async def start_storage_manager():
+    storage_manager.init_registry()
+    app.state.archive_task = asyncio.create_task(archive_cold_datasets_periodically())
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Differential Privacy API!"}
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.db.base import Base
+
+class Dataset(Base):
+    __tablename__ = "datasets"
+    
+    name = Column(String, primary_key=True, index=True)  # e.g. db_1a2b3c4d.db
+    tier = Column(String, nullable=False, default="hot", index=True)  # hot | cold
+    size_bytes = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)
+    last_accessed_at = Column(DateTime, nullable=False, index=True)
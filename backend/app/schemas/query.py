@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Literal, Optional, Dict, Any, Union
+from typing import Literal, Optional, Dict, Any, Union, List
 from enum import Enum
 
 class QueryOperation(str, Enum):
@@ -19,6 +19,7 @@ class DifferentialPrivacyQuery(BaseModel):
     epsilon_budget: float = Field(default=5.0, gt=0, description="Total privacy budget available")
     database_name: str = Field(..., description="Database file name")
     filters: Optional[Dict[str, FilterCondition]] = Field(None, description="Optional filters for the query")
+    approximate: bool = Field(default=False, description="Answer from the stored uniform sample instead of scanning the table")
 
 class QueryResponse(BaseModel):
     result: float
@@ -28,3 +29,42 @@ class QueryResponse(BaseModel):
     epsilon: float
     noise_added: float
     message: str
+    approximate: bool = False
+    error_bound: Optional[float] = None
+    sample_rate: Optional[float] = None
+
+class BucketCountQuery(BaseModel):
+    column: str = Field(..., description="Numeric or date column to bucket")
+    table: str = Field(..., description="Table name to query")
+    boundaries: List[Union[str, int, float]] = Field(..., min_length=2, description="Strictly increasing bucket edges; bucket i is [boundaries[i], boundaries[i+1])")
+    epsilon: float = Field(..., gt=0, description="Privacy parameter (epsilon > 0)")
+    epsilon_budget: float = Field(default=5.0, gt=0, description="Total privacy budget available")
+    database_name: str = Field(..., description="Database file name")
+
+class BucketCountResponse(BaseModel):
+    counts: List[Optional[float]]  # None for buckets suppressed as too small
+    boundaries: List[Union[str, int, float]]
+    column: str
+    table: str
+    epsilon: float
+    noise_added: List[Optional[float]]
+    message: str
+
+class FederatedQuery(BaseModel):
+    operation: QueryOperation
+    column: str = Field(..., description="Column name to perform operation on")
+    table: str = Field(..., description="Table name to query in every database")
+    epsilon: float = Field(..., gt=0, description="Privacy parameter (epsilon > 0)")
+    epsilon_budget: float = Field(default=5.0, gt=0, description="Total privacy budget available")
+    database_names: List[str] = Field(..., min_length=1, description="Database file names holding disjoint records")
+    filters: Optional[Dict[str, FilterCondition]] = Field(None, description="Optional filters for the query")
+
+class FederatedQueryResponse(BaseModel):
+    result: float
+    operation: QueryOperation
+    column: str
+    table: str
+    database_names: List[str]
+    epsilon: float
+    noise_added: float
+    message: str
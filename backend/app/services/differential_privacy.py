@@ -1,8 +1,20 @@
 import numpy as np
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Callable
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.schemas.query import QueryOperation
+from app.services.range_index import range_aggregate, bucket_counts
+from app.services.sampling import get_sample_info, sample_moments
+
+# Minimum cohort size to avoid releasing statistics about tiny groups
+MIN_COHORT = 25
+
+# Upper bound on databases aggregated concurrently by a federated query
+MAX_FEDERATED_WORKERS = 8
+
+# z-score for the 95% sampling error bound reported by approximate queries
+Z_95 = 1.96
 
 class DifferentialPrivacyService:
     """
@@ -55,7 +67,6 @@ class DifferentialPrivacyService:
         """
         # Optional: enforce minimum cohort size to avoid tiny groups
         cohort_size = self._get_count(table, db, filters)
-        MIN_COHORT = 25
         if cohort_size < MIN_COHORT:
             raise ValueError(f"Cohort too small (n={cohort_size}). Minimum required is {MIN_COHORT} to protect privacy.")
 
@@ -69,7 +80,199 @@ class DifferentialPrivacyService:
         private_result, noise = self.add_laplace_noise(true_result, epsilon, sensitivity)
         
         return private_result, noise
-    
+
+    def execute_approximate_query(
+        self,
+        operation: QueryOperation,
+        column: str,
+        table: str,
+        epsilon: float,
+        db: Session,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> tuple[float, float, float, float]:
+        """
+        Execute a differentially private query on the stored uniform sample
+
+        COUNT and SUM are scaled by 1/q (Horvitz-Thompson), AVERAGE is the
+        sample ratio. The sample is stored once and reused by every query, so
+        no subsampling amplification is claimed: noise is calibrated at the
+        requested epsilon to the sensitivity of the scaled estimate (1/q for
+        COUNT and SUM).
+
+        Returns:
+            Tuple of (private_result, noise_added, error_bound, sample_rate) where
+            error_bound adds the 95% sampling error and the 95% noise magnitude
+        """
+        info = get_sample_info(db, table)
+        if info is None:
+            raise ValueError(f"No sample stored for table '{table}'. Run the query without approximate mode.")
+        rate = info["sample_rate"]
+
+        where_sql, params = self._build_where_clause(filters)
+        moment_column = None if operation == QueryOperation.COUNT else column
+        n, total, total_sq = sample_moments(db, info["sample_table"], moment_column, where_sql, params)
+
+        # Check the sample rows actually used, not the scaled estimate, so
+        # approximate mode never answers from fewer rows than /query allows
+        if n < MIN_COHORT:
+            raise ValueError(f"Cohort too small in sample (n={n}). Minimum required is {MIN_COHORT} to protect privacy.")
+
+        sensitivity = self.sensitivity[operation]
+        if operation == QueryOperation.COUNT:
+            estimate = n / rate
+            std_error = np.sqrt(n * (1 - rate)) / rate
+            sensitivity = sensitivity / rate
+        elif operation == QueryOperation.SUM:
+            estimate = total / rate
+            std_error = np.sqrt(total_sq * (1 - rate)) / rate
+            sensitivity = sensitivity / rate
+        else:
+            estimate = total / n if n else 0.0
+            variance = max(total_sq / n - estimate ** 2, 0.0) if n else 0.0
+            std_error = np.sqrt(variance * (1 - rate) / n) if n else 0.0
+
+        private_result, noise = self.add_laplace_noise(estimate, epsilon, sensitivity)
+
+        # Laplace(b) exceeds b * ln(20) with probability 5%
+        noise_bound = sensitivity / epsilon * np.log(20)
+        error_bound = float(Z_95 * std_error + noise_bound)
+
+        return private_result, noise, error_bound, rate
+
+    def execute_federated_query(
+        self,
+        operation: QueryOperation,
+        column: str,
+        table: str,
+        epsilon: float,
+        database_names: List[str],
+        open_session: Callable[[str], Session],
+        filters: Optional[Dict[str, Any]] = None
+    ) -> tuple[float, float]:
+        """
+        Execute one differentially private query over several databases
+
+        Exact partial COUNT/SUM values are computed on each database
+        concurrently, summed, and noise is added once to the combined result.
+        Databases are assumed to hold disjoint records (e.g. per site or per
+        month), so the sensitivity is the same as for a single database.
+
+        Args:
+            database_names: Databases to aggregate over
+            open_session: Opens a new Session for a database name; called once
+                per worker thread since Sessions are not thread-safe
+
+        Returns:
+            Tuple of (private_result, noise_added)
+        """
+        def partial(database_name: str) -> tuple[int, float]:
+            db = open_session(database_name)
+            try:
+                return self._get_partial_aggregate(operation, column, table, db, filters)
+            finally:
+                db.close()
+
+        workers = min(len(database_names), MAX_FEDERATED_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(partial, database_names))
+
+        cohort_size = sum(count for count, _ in partials)
+        if cohort_size < MIN_COHORT:
+            raise ValueError(f"Cohort too small (n={cohort_size}). Minimum required is {MIN_COHORT} to protect privacy.")
+
+        total = sum(value for _, value in partials)
+        if operation == QueryOperation.COUNT:
+            true_result = float(cohort_size)
+        elif operation == QueryOperation.SUM:
+            true_result = float(total)
+        else:
+            true_result = float(total / cohort_size)
+
+        sensitivity = self.sensitivity[operation]
+        return self.add_laplace_noise(true_result, epsilon, sensitivity)
+
+    def execute_private_bucket_counts(
+        self,
+        column: str,
+        table: str,
+        boundaries: List[Any],
+        epsilon: float,
+        db: Session
+    ) -> tuple[List[Optional[float]], List[Optional[float]]]:
+        """
+        Execute a differentially private histogram over consecutive buckets
+        [boundaries[i], boundaries[i+1]) of a numeric or date column.
+
+        Buckets are disjoint, so each gets Laplace noise at the full epsilon
+        (parallel composition). Buckets with fewer than MIN_COHORT rows are
+        suppressed (None), as /query refuses such cohorts.
+
+        Returns:
+            Tuple of (private_counts, noise_added) with one entry per bucket
+        """
+        if len(boundaries) < 2:
+            raise ValueError("At least two bucket boundaries are required.")
+        try:
+            ascending = all(lo < hi for lo, hi in zip(boundaries, boundaries[1:]))
+        except TypeError:
+            raise ValueError("Bucket boundaries must all be numbers or all be dates.")
+        if not ascending:
+            raise ValueError("Bucket boundaries must be strictly increasing.")
+
+        true_counts = bucket_counts(db, table, column, boundaries)
+        if true_counts is None:
+            # No range index for this column: count each bucket with a scan
+            sql = text(f"SELECT COUNT(*) FROM {table} WHERE {column} >= :lo AND {column} < :hi")
+            true_counts = [
+                int(db.execute(sql, {"lo": lo, "hi": hi}).scalar() or 0)
+                for lo, hi in zip(boundaries, boundaries[1:])
+            ]
+
+        sensitivity = self.sensitivity[QueryOperation.COUNT]
+        results = [
+            self.add_laplace_noise(float(c), epsilon, sensitivity) if c >= MIN_COHORT else (None, None)
+            for c in true_counts
+        ]
+        return [r for r, _ in results], [n for _, n in results]
+
+    def _parse_filter(self, filter_spec) -> tuple[str, Any]:
+        """Return (operator, value) for a filter in any of the accepted formats."""
+        # Check if filter_spec is a Pydantic model (has attributes)
+        if hasattr(filter_spec, 'operator') and hasattr(filter_spec, 'value'):
+            operator = filter_spec.operator
+            value = filter_spec.value
+        # Check if filter_spec is a dict with operator (dict format)
+        elif isinstance(filter_spec, dict) and 'operator' in filter_spec:
+            operator = filter_spec['operator']
+            value = filter_spec['value']
+        else:
+            # Legacy format: plain value means equality
+            operator = '='
+            value = filter_spec
+
+        # Validate operator for safety (prevent SQL injection)
+        allowed_operators = ['=', '!=', '>', '>=', '<', '<=']
+        if operator not in allowed_operators:
+            operator = '='
+        return operator, value
+
+    def _indexed_aggregate(
+        self,
+        table: str,
+        db: Session,
+        filters: Optional[Dict[str, Any]],
+        column: Optional[str] = None
+    ) -> Optional[tuple[int, float]]:
+        """
+        Answer (count, sum) from the prefix-sum range index when the query has
+        a single filter. Returns None if the query must be answered by a scan.
+        """
+        if not filters or len(filters) != 1:
+            return None
+        col, filter_spec = next(iter(filters.items()))
+        operator, value = self._parse_filter(filter_spec)
+        return range_aggregate(db, table, col, operator, value, column)
+
     def _build_where_clause(self, filters: Optional[Dict[str, Any]]):
         """
         Build WHERE clause from filters.
@@ -85,25 +288,7 @@ class DifferentialPrivacyService:
         
         for i, (col, filter_spec) in enumerate(filters.items()):
             key = f"p{i}"
-            
-            # Check if filter_spec is a Pydantic model (has attributes)
-            if hasattr(filter_spec, 'operator') and hasattr(filter_spec, 'value'):
-                operator = filter_spec.operator
-                value = filter_spec.value
-            # Check if filter_spec is a dict with operator (dict format)
-            elif isinstance(filter_spec, dict) and 'operator' in filter_spec:
-                operator = filter_spec['operator']
-                value = filter_spec['value']
-            else:
-                # Legacy format: plain value means equality
-                operator = '='
-                value = filter_spec
-            
-            # Validate operator for safety (prevent SQL injection)
-            allowed_operators = ['=', '!=', '>', '>=', '<', '<=']
-            if operator not in allowed_operators:
-                operator = '='
-            
+            operator, value = self._parse_filter(filter_spec)
             clauses.append(f"{col} {operator} :{key}")
             params[key] = value
         
@@ -117,6 +302,18 @@ class DifferentialPrivacyService:
         db: Session,
         filters: Optional[Dict[str, {"value": Any, "operator": str}]] = None
     ) -> float:
+        if operation in (QueryOperation.SUM, QueryOperation.AVERAGE):
+            indexed = self._indexed_aggregate(table, db, filters, column)
+        else:
+            indexed = self._indexed_aggregate(table, db, filters)
+        if indexed is not None:
+            count, total = indexed
+            if operation == QueryOperation.COUNT:
+                return float(count)
+            if operation == QueryOperation.SUM:
+                return float(total)
+            return float(total / count) if count else 0.0
+
         where_sql, params = self._build_where_clause(filters)
 
         if operation == QueryOperation.COUNT:
@@ -134,7 +331,31 @@ class DifferentialPrivacyService:
         
         return 0.0
 
+    def _get_partial_aggregate(
+        self,
+        operation: QueryOperation,
+        column: str,
+        table: str,
+        db: Session,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> tuple[int, float]:
+        """Exact (count, SUM(column)) of matching rows, the mergeable parts of any aggregate."""
+        if operation == QueryOperation.COUNT:
+            return self._get_count(table, db, filters), 0.0
+
+        indexed = self._indexed_aggregate(table, db, filters, column)
+        if indexed is not None:
+            return indexed
+
+        where_sql, params = self._build_where_clause(filters)
+        sql = text(f"SELECT COUNT(*), SUM({column}) FROM {table}{where_sql}")
+        row = db.execute(sql, params).fetchone()
+        return int(row[0] or 0), float(row[1] or 0)
+
     def _get_count(self, table: str, db: Session, filters: Optional[Dict[str, Any]] = None) -> int:
+        indexed = self._indexed_aggregate(table, db, filters)
+        if indexed is not None:
+            return indexed[0]
         where_sql, params = self._build_where_clause(filters)
         sql = text(f"SELECT COUNT(*) FROM {table}{where_sql}")
         result = db.execute(sql, params).scalar()
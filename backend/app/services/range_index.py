@@ -0,0 +1,159 @@
+import json
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Tables created by the ingest pipeline for internal use share this prefix so
+# they can be hidden from the table listing.
+INTERNAL_TABLE_PREFIX = "_dp_"
+RANGE_META_TABLE = f"{INTERNAL_TABLE_PREFIX}range_meta"
+
+RANGE_OPERATORS = ['=', '!=', '>', '>=', '<', '<=']
+
+
+def _index_table_name(table_name: str, position: int) -> str:
+    # Index tables and their sum columns are named by column position, not by
+    # column name, since uploaded headers may not be valid SQL identifiers.
+    # The name mapping is kept in RANGE_META_TABLE.
+    return f"{INTERNAL_TABLE_PREFIX}rangeidx_{table_name}_{position}"
+
+
+def build_range_indexes(df: pd.DataFrame, db_path: str, table_name: str, schema: Dict[str, str]):
+    """
+    Build prefix-sum indexes for every numeric and date column of a table.
+
+    For each filter column the index holds one row per distinct value, sorted,
+    with the cumulative row count and the cumulative SUM of every numeric
+    column (stored as sum_<position in sum_columns>) up to and including that
+    value. A range COUNT/SUM then becomes the difference of two prefix rows
+    found by B-tree seeks.
+    """
+    numeric_cols = [c for c in df.columns if schema.get(c) == "numeric"]
+    key_cols = [c for c in df.columns if schema.get(c) in ("numeric", "date")]
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {RANGE_META_TABLE}")
+        conn.execute(
+            f"CREATE TABLE {RANGE_META_TABLE} ("
+            "table_name TEXT, filter_column TEXT, index_table TEXT, sum_columns TEXT, "
+            "PRIMARY KEY (table_name, filter_column))"
+        )
+        for position, col in enumerate(key_cols):
+            # Group by an unnamed array so pandas never treats `col` as the
+            # grouping key and drops it from the summed columns
+            grouped = df[numeric_cols].groupby(df[col].to_numpy(), sort=True)
+            prefix = grouped.sum().cumsum()
+            prefix.columns = [f"sum_{i}" for i in range(len(numeric_cols))]
+            prefix.insert(0, "cnt", grouped.size().cumsum())
+            prefix.index.name = "key"
+
+            index_table = _index_table_name(table_name, position)
+            prefix.reset_index().to_sql(index_table, conn, if_exists="replace", index=False)
+            conn.execute(f"CREATE UNIQUE INDEX ix_{index_table}_key ON {index_table}(key)")
+            conn.execute(
+                f"INSERT INTO {RANGE_META_TABLE} VALUES (?, ?, ?, ?)",
+                (table_name, col, index_table, json.dumps(numeric_cols)),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _lookup_index(db: Session, table: str, filter_column: str) -> Optional[Dict[str, Any]]:
+    """Return the index table and summable columns for a filter column, if indexed."""
+    exists = db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"),
+        {"name": RANGE_META_TABLE},
+    ).scalar()
+    if not exists:
+        return None
+    row = db.execute(
+        text(f"SELECT index_table, sum_columns FROM {RANGE_META_TABLE} "
+             "WHERE table_name=:table AND filter_column=:col"),
+        {"table": table, "col": filter_column},
+    ).fetchone()
+    if row is None:
+        return None
+    return {"index_table": row[0], "sum_columns": json.loads(row[1])}
+
+
+def _prefix(db: Session, index_table: str, select_sql: str, operator: Optional[str], value: Any) -> tuple[int, float]:
+    """
+    Cumulative (count, sum) over all keys satisfying `key <operator> value`,
+    where operator is '<' or '<='. With no operator the table totals are returned.
+    """
+    if operator is None:
+        sql = text(f"SELECT {select_sql} FROM {index_table} ORDER BY key DESC LIMIT 1")
+        row = db.execute(sql).fetchone()
+    else:
+        sql = text(f"SELECT {select_sql} FROM {index_table} WHERE key {operator} :v ORDER BY key DESC LIMIT 1")
+        row = db.execute(sql, {"v": value}).fetchone()
+    if row is None:
+        return 0, 0.0
+    return int(row[0] or 0), float(row[1] or 0)
+
+
+def range_aggregate(
+    db: Session,
+    table: str,
+    filter_column: str,
+    operator: str,
+    value: Any,
+    column: Optional[str] = None,
+) -> Optional[tuple[int, float]]:
+    """
+    Answer COUNT and SUM(column) for rows where `filter_column <operator> value`
+    from the prefix-sum index.
+
+    Returns (count, sum) or None if the index cannot answer the query, in which
+    case the caller should fall back to scanning the table.
+    """
+    if operator not in RANGE_OPERATORS:
+        return None
+    index = _lookup_index(db, table, filter_column)
+    if index is None:
+        return None
+    if column is not None and column not in index["sum_columns"]:
+        return None
+
+    index_table = index["index_table"]
+    select_sql = f"cnt, sum_{index['sum_columns'].index(column)}" if column is not None else "cnt, 0"
+
+    if operator == '<':
+        return _prefix(db, index_table, select_sql, '<', value)
+    if operator == '<=':
+        return _prefix(db, index_table, select_sql, '<=', value)
+
+    total_count, total_sum = _prefix(db, index_table, select_sql, None, None)
+    if operator == '>':
+        below_count, below_sum = _prefix(db, index_table, select_sql, '<=', value)
+        return total_count - below_count, total_sum - below_sum
+    if operator == '>=':
+        below_count, below_sum = _prefix(db, index_table, select_sql, '<', value)
+        return total_count - below_count, total_sum - below_sum
+
+    upto_count, upto_sum = _prefix(db, index_table, select_sql, '<=', value)
+    below_count, below_sum = _prefix(db, index_table, select_sql, '<', value)
+    eq_count, eq_sum = upto_count - below_count, upto_sum - below_sum
+    if operator == '=':
+        return eq_count, eq_sum
+    return total_count - eq_count, total_sum - eq_sum
+
+
+def bucket_counts(db: Session, table: str, column: str, boundaries: Sequence[Any]) -> Optional[List[int]]:
+    """
+    Row counts for consecutive buckets [boundaries[i], boundaries[i+1]).
+
+    Works for numeric and date columns alike (dates are stored as ISO strings,
+    so lexicographic order is chronological). Returns None if the column is
+    not indexed.
+    """
+    index = _lookup_index(db, table, column)
+    if index is None:
+        return None
+    edges = [_prefix(db, index["index_table"], "cnt, 0", '<', b)[0] for b in boundaries]
+    return [hi - lo for lo, hi in zip(edges, edges[1:])]
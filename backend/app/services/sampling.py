@@ -0,0 +1,87 @@
+import sqlite3
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.range_index import INTERNAL_TABLE_PREFIX
+
+SAMPLE_META_TABLE = f"{INTERNAL_TABLE_PREFIX}sample_meta"
+
+# Expected rows in the sample table. Kept fixed so approximate queries cost
+# the same no matter how large the uploaded dataset is.
+DEFAULT_SAMPLE_ROWS = 10_000
+
+
+def _sample_table_name(table_name: str) -> str:
+    return f"{INTERNAL_TABLE_PREFIX}sample_{table_name}"
+
+
+def build_sample_table(df: pd.DataFrame, db_path: str, table_name: str, sample_rows: int = DEFAULT_SAMPLE_ROWS):
+    """
+    Store a uniform Bernoulli sample of a table next to it.
+
+    Every row is kept independently with probability q = sample_rows / N
+    (capped at 1), which keeps Horvitz-Thompson estimates unbiased.
+    """
+    population_rows = len(df)
+    rate = min(1.0, sample_rows / population_rows) if population_rows else 1.0
+    rng = np.random.default_rng()
+    sample = df[rng.random(population_rows) < rate]
+
+    sample_table = _sample_table_name(table_name)
+    conn = sqlite3.connect(db_path)
+    try:
+        sample.to_sql(sample_table, conn, if_exists="replace", index=False)
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {SAMPLE_META_TABLE} ("
+            "table_name TEXT PRIMARY KEY, sample_table TEXT, sample_rate REAL, "
+            "sample_rows INTEGER, population_rows INTEGER)"
+        )
+        conn.execute(
+            f"INSERT OR REPLACE INTO {SAMPLE_META_TABLE} VALUES (?, ?, ?, ?, ?)",
+            (table_name, sample_table, rate, len(sample), population_rows),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_sample_info(db: Session, table: str) -> Optional[Dict[str, Any]]:
+    """Return the sample table and sampling rate for a table, if one was stored."""
+    exists = db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"),
+        {"name": SAMPLE_META_TABLE},
+    ).scalar()
+    if not exists:
+        return None
+    row = db.execute(
+        text(f"SELECT sample_table, sample_rate, sample_rows, population_rows "
+             f"FROM {SAMPLE_META_TABLE} WHERE table_name=:table"),
+        {"table": table},
+    ).fetchone()
+    if row is None:
+        return None
+    return {
+        "sample_table": row[0],
+        "sample_rate": float(row[1]),
+        "sample_rows": int(row[2]),
+        "population_rows": int(row[3]),
+    }
+
+
+def sample_moments(
+    db: Session,
+    sample_table: str,
+    column: Optional[str],
+    where_sql: str,
+    params: Dict[str, Any]
+) -> tuple[int, float, float]:
+    """Return (count, SUM(column), SUM(column^2)) over matching sample rows."""
+    moments = f"SUM({column}), SUM({column} * {column})" if column is not None else "0, 0"
+    sql = text(f"SELECT COUNT(*), {moments} FROM {sample_table}{where_sql}")
+    row = db.execute(sql, params).fetchone()
+    return int(row[0] or 0), float(row[1] or 0), float(row[2] or 0)
+
@@ -0,0 +1,300 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.db.base import Base, SessionLocal, engine as registry_engine
+from app.models.dataset import Dataset
+
+HOT = "hot"
+COLD = "cold"
+
+
+class _DatasetSession(Session):
+    """Session that releases its dataset's in-use count when closed"""
+
+    _release: Optional[Callable[[], None]] = None
+
+    def close(self):
+        super().close()
+        if self._release is not None:
+            release, self._release = self._release, None
+            release()
+
+
+class _DatasetConnection(sqlite3.Connection):
+    """sqlite3 connection that releases its dataset's in-use count when closed"""
+
+    _release: Optional[Callable[[], None]] = None
+
+    def close(self):
+        super().close()
+        if self._release is not None:
+            release, self._release = self._release, None
+            release()
+
+
+class DatasetStorageManager:
+    """
+    Tiered storage for uploaded datasets
+
+    Hot datasets are plain SQLite files in DATASET_DIR, opened with mmap.
+    Datasets idle for longer than COLD_AFTER_SECONDS are gzip-compressed into
+    ARCHIVE_DIR and restored transparently the next time they are opened.
+    Datasets with open sessions or connections are never archived.
+    The `datasets` registry table is the source of truth for what exists.
+    """
+
+    def __init__(
+        self,
+        dataset_dir: str = settings.DATASET_DIR,
+        archive_dir: str = settings.ARCHIVE_DIR,
+        cold_after_seconds: int = settings.COLD_AFTER_SECONDS,
+        compress_level: int = settings.ARCHIVE_COMPRESS_LEVEL
+    ):
+        self.dataset_dir = dataset_dir
+        self.archive_dir = archive_dir
+        self.cold_after = timedelta(seconds=cold_after_seconds)
+        self.compress_level = compress_level
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._in_use: Dict[str, int] = {}
+        self._initialized = False
+
+    def _lock(self, name: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def hot_path(self, name: str) -> str:
+        return os.path.join(self.dataset_dir, name)
+
+    def archive_path(self, name: str) -> str:
+        return os.path.join(self.archive_dir, f"{name}.gz")
+
+    def init_registry(self):
+        """
+        Create the registry table and, the first time it is empty, register
+        datasets already on disk from before the registry existed.
+        """
+        if self._initialized:
+            return
+        Base.metadata.create_all(bind=registry_engine, tables=[Dataset.__table__])
+        os.makedirs(self.archive_dir, exist_ok=True)
+        db = SessionLocal()
+        try:
+            if db.query(Dataset).first() is None:
+                for f in os.listdir(self.dataset_dir):
+                    if f.startswith("db_") and f.endswith(".db"):
+                        db.add(self._new_record(f, HOT, os.path.getsize(self.hot_path(f))))
+                for f in os.listdir(self.archive_dir):
+                    if f.endswith(".db.gz"):
+                        name = f[:-len(".gz")]
+                        db.add(self._new_record(name, COLD, os.path.getsize(self.archive_path(name))))
+                db.commit()
+        finally:
+            db.close()
+        self._initialized = True
+
+    def _new_record(self, name: str, tier: str, size_bytes: int) -> Dataset:
+        now = datetime.now()
+        return Dataset(name=name, tier=tier, size_bytes=size_bytes, created_at=now, last_accessed_at=now)
+
+    def register(self, name: str):
+        """Register a newly uploaded hot dataset."""
+        self.init_registry()
+        db = SessionLocal()
+        try:
+            db.merge(self._new_record(name, HOT, os.path.getsize(self.hot_path(name))))
+            db.commit()
+        finally:
+            db.close()
+
+    def list_datasets(self) -> List[Dict[str, Any]]:
+        self.init_registry()
+        db = SessionLocal()
+        try:
+            return [
+                {
+                    "name": d.name,
+                    "tier": d.tier,
+                    "size_bytes": d.size_bytes,
+                    "last_accessed_at": d.last_accessed_at.isoformat(),
+                }
+                for d in db.query(Dataset).order_by(Dataset.created_at).all()
+            ]
+        finally:
+            db.close()
+
+    def exists(self, name: str) -> bool:
+        self.init_registry()
+        db = SessionLocal()
+        try:
+            return db.get(Dataset, name) is not None
+        finally:
+            db.close()
+
+    def ensure_hot(self, name: str, acquire: bool = False) -> str:
+        """
+        Make a dataset available as a plain SQLite file, restoring it from the
+        archive if it is cold, and record the access.
+
+        Args:
+            acquire: also mark the dataset in use so it cannot be archived
+                until the matching _release
+
+        Returns:
+            Path of the hot database file
+
+        Raises:
+            FileNotFoundError: if the dataset is not registered or neither its
+                hot file nor its archive exists
+        """
+        self.init_registry()
+        with self._lock(name):
+            db = SessionLocal()
+            try:
+                record = db.get(Dataset, name)
+                if record is None:
+                    raise FileNotFoundError(f"Database '{name}' not found")
+                hot_exists = os.path.exists(self.hot_path(name))
+                if record.tier == COLD or not hot_exists:
+                    # A hot record can lack its file if archiving was interrupted
+                    # or the file was removed by hand; recover from the archive
+                    # rather than letting SQLite create an empty database
+                    if os.path.exists(self.archive_path(name)):
+                        started = time.monotonic()
+                        self._restore(name)
+                        print(f"Restored {name} from archive in {time.monotonic() - started:.2f}s")
+                    elif not hot_exists:
+                        raise FileNotFoundError(f"Database '{name}' files are missing")
+                    record.tier = HOT
+                    record.size_bytes = os.path.getsize(self.hot_path(name))
+                record.last_accessed_at = datetime.now()
+                db.commit()
+            finally:
+                db.close()
+            if acquire:
+                self._in_use[name] = self._in_use.get(name, 0) + 1
+        return self.hot_path(name)
+
+    def _release(self, name: str):
+        with self._lock(name):
+            self._in_use[name] -= 1
+            if not self._in_use[name]:
+                del self._in_use[name]
+
+    def _restore(self, name: str):
+        tmp_path = self.hot_path(name) + ".restoring"
+        with gzip.open(self.archive_path(name), "rb") as src, open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, length=1024 * 1024)
+        os.replace(tmp_path, self.hot_path(name))
+        os.remove(self.archive_path(name))
+
+    def archive(self, name: str, idle_before: Optional[datetime] = None) -> bool:
+        """
+        Compress a hot dataset into the archive tier.
+
+        Args:
+            idle_before: only archive if the dataset was last accessed before
+                this time; checked under the dataset lock
+
+        Returns:
+            False if the dataset was not hot, is in use, or is no longer idle
+        """
+        self.init_registry()
+        with self._lock(name):
+            if self._in_use.get(name):
+                return False
+            db = SessionLocal()
+            try:
+                record = db.get(Dataset, name)
+                if record is None or record.tier != HOT:
+                    return False
+                if idle_before is not None and record.last_accessed_at >= idle_before:
+                    return False
+                tmp_path = self.archive_path(name) + ".tmp"
+                with open(self.hot_path(name), "rb") as src, \
+                        gzip.open(tmp_path, "wb", compresslevel=self.compress_level) as dst:
+                    shutil.copyfileobj(src, dst, length=1024 * 1024)
+                os.replace(tmp_path, self.archive_path(name))
+                os.remove(self.hot_path(name))
+                record.tier = COLD
+                record.size_bytes = os.path.getsize(self.archive_path(name))
+                db.commit()
+                return True
+            finally:
+                db.close()
+
+    def archive_cold_datasets(self) -> List[str]:
+        """Archive every hot dataset not accessed within COLD_AFTER_SECONDS."""
+        self.init_registry()
+        cutoff = datetime.now() - self.cold_after
+        db = SessionLocal()
+        try:
+            idle = [
+                d.name for d in db.query(Dataset)
+                .filter(Dataset.tier == HOT, Dataset.last_accessed_at < cutoff)
+                .all()
+            ]
+        finally:
+            db.close()
+        return [name for name in idle if self.archive(name, idle_before=cutoff)]
+
+    def delete(self, name: str):
+        """Remove a dataset from both tiers and the registry."""
+        self.init_registry()
+        with self._lock(name):
+            db = SessionLocal()
+            try:
+                record = db.get(Dataset, name)
+                if record is None:
+                    raise FileNotFoundError(f"Database '{name}' not found")
+                for path in (self.hot_path(name), self.archive_path(name)):
+                    if os.path.exists(path):
+                        os.remove(path)
+                db.delete(record)
+                db.commit()
+            finally:
+                db.close()
+
+    def open_session(self, name: str) -> Session:
+        """
+        Open a SQLAlchemy Session on a dataset, restoring it first if cold.
+        The dataset stays in use, and is not archived, until the Session is closed.
+        """
+        path = self.ensure_hot(name, acquire=True)
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+
+        @event.listens_for(engine, "connect")
+        def _enable_mmap(dbapi_connection, connection_record):
+            dbapi_connection.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+
+        session = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=_DatasetSession)()
+
+        def release():
+            engine.dispose()
+            self._release(name)
+
+        session._release = release
+        return session
+
+    def connect(self, name: str) -> sqlite3.Connection:
+        """
+        Open a sqlite3 connection on a dataset, restoring it first if cold.
+        The dataset stays in use, and is not archived, until the connection is closed.
+        """
+        conn = sqlite3.connect(self.ensure_hot(name, acquire=True), factory=_DatasetConnection)
+        conn._release = lambda: self._release(name)
+        conn.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        return conn
+
+
+storage_manager = DatasetStorageManager()
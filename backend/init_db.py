@@ -3,6 +3,7 @@ from app.db.base import Base, engine
 def init_db():
     # Import all models here to ensure they are registered with SQLAlchemy
     from app.models.item import Item  # noqa: F401
+    from app.models.dataset import Dataset  # noqa: F401
     
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)